@@ -17,7 +17,7 @@
 import copy
 import os
 import sys
-from collections import OrderedDict, namedtuple, UserDict
+from collections import namedtuple, UserDict
 from functools import partial
 from types import SimpleNamespace
 from typing import Any, List, Tuple, Union
@@ -46,10 +46,13 @@ class AyxPlugin:
         self._engine_vars.alteryx_engine = alteryx_engine
         self._engine_vars.output_anchor_mgr = output_anchor_mgr
         self._raised_missing = False
+        self._update_only_mode = None
 
         # Plugin State vars
         self._state_vars = SimpleNamespace(
             initialized=False,
+            metadata_built=False,
+            streaming_interface=None,
             input_anchors={},
             output_anchors={},
             config_data=None,
@@ -101,6 +104,10 @@ class AyxPlugin:
         ):
             self._state_vars.output_anchors[connection["@Name"]] = OutputAnchor()
 
+        # Output anchors are fixed by the config, so keep a flat list of the ones
+        # that still have metadata to push rather than walking the anchor dict
+        self._pending_metadata_anchors = list(self._state_vars.output_anchors.values())
+
         # Custom data
         self.user_data = SimpleNamespace()
 
@@ -122,12 +129,16 @@ class AyxPlugin:
     @property
     def update_only_mode(self) -> bool:
         """Getter for if designer is in update only mode."""
-        return (
-            self._engine_vars.alteryx_engine.get_init_var(
-                self._engine_vars.n_tool_id, "UpdateOnly"
+        # The init vars are fixed for the life of the plugin, so only ask the
+        # engine once
+        if self._update_only_mode is None:
+            self._update_only_mode = (
+                self._engine_vars.alteryx_engine.get_init_var(
+                    self._engine_vars.n_tool_id, "UpdateOnly"
+                )
+                == "True"
             )
-            == "True"
-        )
+        return self._update_only_mode
 
     @property
     def all_inputs_completed(self) -> bool:
@@ -205,19 +216,19 @@ class AyxPlugin:
             self._engine_vars.n_tool_id, d_percentage
         )  # Inform the Alteryx engine of the tool's progress.
 
-        for _, anchor in self._state_vars.output_anchors.items():
+        for anchor in self._state_vars.output_anchors.values():
             # Inform the downstream tool of this tool's progress.
             anchor._handler.update_progress(d_percentage)
 
     def close_all_outputs(self) -> None:
         """Force all output anchors to close."""
         # Close all output anchors
-        for _, anchor in self._state_vars.output_anchors.items():
+        for anchor in self._state_vars.output_anchors.values():
             anchor._handler.close()
 
         # Checks whether connections were properly closed.
-        for anchor_name in self._state_vars.output_anchors:
-            self._state_vars.output_anchors[anchor_name]._handler.assert_close()
+        for anchor in self._state_vars.output_anchors.values():
+            anchor._handler.assert_close()
 
     def push_all_output_records(self) -> None:
         """
@@ -232,14 +243,23 @@ class AyxPlugin:
         -------
         None
         """
-        for _, output_anchor in self._state_vars.output_anchors.items():
+        for output_anchor in self._state_vars.output_anchors.values():
             output_anchor.push_records(self)
 
     def push_all_metadata(self) -> None:
         """Pushes all output anchor metadata downstream."""
-        for _, anchor in self._state_vars.output_anchors.items():
+        pending = self._pending_metadata_anchors
+        if not pending:
+            return
+
+        for anchor in pending:
             anchor.push_metadata(self)
 
+        # Each anchor only pushes its metadata once, so stop revisiting those done
+        self._pending_metadata_anchors = [
+            anchor for anchor in pending if anchor._record_info_out is None
+        ]
+
     def clear_accumulated_records(self) -> None:
         """
         Clear all accumulated records from all plugin interfaces.
@@ -254,7 +274,7 @@ class AyxPlugin:
         None
             This function has side effects on plugin, and therefore has no return
         """
-        for _, anchor in self._state_vars.input_anchors.items():
+        for anchor in self._state_vars.input_anchors.values():
             for connection in anchor:
                 connection._interface_record_vars.record_list_in = []
 
@@ -272,7 +292,10 @@ class AyxPluginInterface:
         self.initialized = False
 
         self._interface_record_vars = SimpleNamespace(
-            record_info_in=None, record_list_in=[], column_metadata=None
+            record_info_in=None,
+            record_list_in=[],
+            current_record=None,
+            column_metadata=None,
         )
 
         self._interface_state = SimpleNamespace(
@@ -289,13 +312,17 @@ class AyxPluginInterface:
     @property
     def data(self) -> Union[object, List[List[Any]]]:
         """Input data getter."""
-        if (
-            self.parent.process_data_mode == "stream"
-            and self.parent.process_data_input_type == "list"
-        ):
-            return self._interface_record_vars.record_list_in[0]
-        elif self.parent.process_data_input_type == "list":
-            return self._interface_record_vars.record_list_in
+        if self.parent.process_data_mode == "stream":
+            # Streaming holds at most a single record, see set_current_record
+            record = self._interface_record_vars.current_record
+            if self.parent.process_data_input_type == "list":
+                return record
+            records = [] if record is None else [record]
+        else:
+            records = self._interface_record_vars.record_list_in
+
+        if self.parent.process_data_input_type == "list":
+            return records
         else:
             try:
                 import pandas as pd
@@ -305,10 +332,7 @@ class AyxPluginInterface:
                 self.parent.logging.display_error_msg(err_str)
                 raise ImportError(err_str)
             else:
-                return pd.DataFrame(
-                    self._interface_record_vars.record_list_in,
-                    columns=self.metadata.get_column_names(),
-                )
+                return pd.DataFrame(records, columns=self.metadata.get_column_names())
 
     @property
     def completed(self) -> bool:
@@ -369,6 +393,19 @@ class AyxPluginInterface:
 
         self._interface_record_vars.record_list_in.append(row)
 
+    def set_current_record(self, record: sdk.RecordRef) -> None:
+        """Make an incoming record the only record held while streaming."""
+        state_vars = self.parent._state_vars
+
+        # Only one interface at a time ever holds a record
+        previous = state_vars.streaming_interface
+        if previous is not self:
+            if previous is not None:
+                previous._interface_record_vars.current_record = None
+            state_vars.streaming_interface = self
+
+        self._interface_record_vars.current_record = self.get_values_from_record(record)
+
 
 class InputManager(UserDict):
     """Manager of input anchors with helper functions."""
@@ -383,7 +420,7 @@ class InputManager(UserDict):
         return self._plugin._engine_vars.n_tool_id
 
     @property
-    def workflow_config(self) -> OrderedDict:
+    def workflow_config(self) -> dict:
         """Getter for the workflow config."""
         return self._plugin.workflow_config
 
@@ -445,19 +482,15 @@ class OutputAnchor:
 
     def push_metadata(self: object, plugin: object) -> None:
         """Propagate the metadata downstream for this anchor."""
-        out_col_metadata = self.metadata
-        if out_col_metadata is None:
+        # Metadata is only pushed once, so don't copy it on every later call
+        if self._record_info_out is not None or self._metadata is None:
             return
 
-        if self._record_info_out is None:
+        self._record_info_out = plugin.create_record_info()
 
-            self._record_info_out = plugin.create_record_info()
-
-            interface_utils.build_ayx_record_info(
-                out_col_metadata, self._record_info_out
-            )
+        interface_utils.build_ayx_record_info(self._metadata, self._record_info_out)
 
-            self._handler.init(self._record_info_out)
+        self._handler.init(self._record_info_out)
 
     def push_records(self, plugin: object) -> None:
         """
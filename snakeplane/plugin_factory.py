@@ -14,8 +14,11 @@
 """Implementation of a plugin factory for use in snakeplane framework."""
 
 # Built in Libraries
+import copy
+import inspect
 import logging
-from functools import wraps
+from functools import lru_cache, wraps
+from operator import attrgetter
 
 # 3rd Party Libraries
 import AlteryxPythonSDK as sdk
@@ -25,10 +28,22 @@ from snakeplane.helper_classes import AyxPlugin, AyxPluginInterface
 
 import xmltodict
 
+# Timing of engine callbacks is wired in as each callback is registered, starting
+# with the defaults installed by PluginFactory.__init__, so this must be set before
+# the PluginFactory is constructed
 DEBUG = False
 
 logger = logging.getLogger(__name__)
 
+# Accessors for the parameters a user function may request by name
+_PARAMETER_GETTERS = {
+    "input_mgr": attrgetter("input_manager"),
+    "output_mgr": attrgetter("output_manager"),
+    "workflow_config": attrgetter("input_manager.workflow_config"),
+    "user_data": attrgetter("user_data"),
+    "logger": attrgetter("logging"),
+}
+
 
 class PluginFactory:
     """
@@ -38,21 +53,19 @@ class PluginFactory:
     custom user methods while abstracting the boilerplate operations for input and
     output with the Alteryx Engine.
 
-    Attributes
-    ----------
+    Notes
+    -----
     plugin : object
-        The plugin property contains a reference to a dynamic class declaration for the
+        The class returned by generate_plugin is a dynamic class declaration for the
         AyxPlugin class required by the Alteryx Engine for a Python SDK Plugin tool.
-        The plugin object gets updated and further defined by the user as they call
-        methods on the PluginFactory instance (either directly or via decorators).
+        It is built from the methods the user has registered on the PluginFactory
+        instance (either directly or via decorators).
 
     plugin.plugin_interface : object
-        Although not a direct attribute of the PluginFactory class, due to the
-        metaprogramming nature of the PluginFactory, the plugin_interface object is
-        also a reference to a dynamic class declaration for an Alteryx Plugin Interface
-        that is used as a child class instance by the plugin object. The PluginFactory
-        is also dynamically constructing this class declaration based on the user's use
-        of the PluginFactory's methods (either directly or via decorators).
+        The plugin class also carries a dynamic class declaration for an Alteryx
+        Plugin Interface that is used as a child class instance by the plugin
+        object. It is built alongside the plugin from the registered interface
+        methods.
     """
 
     def __init__(self, tool_name: str) -> None:
@@ -78,38 +91,27 @@ class PluginFactory:
         # Make local, per instance copies of the plugins so that multiple plugins
         # can be generated with the same library. Since the plugin factory does
         # metaprogramming, we can't modify the original definitions of
-        # AyxPlugin/AyxPluginInterface without contaminating the package
-        class Plugin(AyxPlugin):
-            pass
-
-        class Interface(AyxPluginInterface):
-            pass
-
-        self._plugin = Plugin
-        self._plugin.plugin_interface = Interface
-
-        setattr(self._plugin, "tool_name", tool_name)
+        # AyxPlugin/AyxPluginInterface without contaminating the package. The
+        # methods are collected here and the classes are created fully formed in
+        # generate_plugin, rather than being patched one attribute at a time
+        self._plugin_ns = {"tool_name": tool_name}
+        self._interface_ns = {}
+        self._generated_plugin = None
 
         # Initialize all required methods with default behavior
-        def noop(*args, **kwargs) -> None:
-            pass
+        self.build_pi_init(_always_true),
+        self.build_pi_add_incoming_connection(_noop),
+        self.build_pi_push_all_records(_noop),
+        self.build_pi_add_outgoing_connection(_always_true)
+        self.build_pi_close(_noop)
 
-        def always_true(*args, **kwargs):
-            return True
+        self.build_ii_init(_always_true),
+        self.build_ii_push_record(_always_true),
+        self.build_ii_update_progress(_noop),
+        self.build_ii_close(_noop)
+        self.build_metadata(_noop)
 
-        self.build_pi_init(always_true),
-        self.build_pi_add_incoming_connection(noop),
-        self.build_pi_push_all_records(noop),
-        self.build_pi_add_outgoing_connection(always_true)
-        self.build_pi_close(noop)
-
-        self.build_ii_init(always_true),
-        self.build_ii_push_record(always_true),
-        self.build_ii_update_progress(noop),
-        self.build_ii_close(noop)
-        self.build_metadata(noop)
-
-        self._init_func = always_true
+        self._init_func = _always_true
 
     def build_pi_init(self, func: object):
         """
@@ -126,6 +128,7 @@ class PluginFactory:
         None
         This method produces side-effects by registering the user defined function
         """
+        self._assert_not_generated()
 
         @_monitor("pi_init")
         @wraps(func)
@@ -133,11 +136,12 @@ class PluginFactory:
             try:
                 current_plugin.update_sys_path()
                 current_plugin.save_output_anchor_refs()
+                current_plugin._state_vars.metadata_built = False
 
-                # Parse XML and save
-                current_plugin.workflow_config = xmltodict.parse(
-                    config_xml, strip_whitespace=False
-                )["Configuration"]
+                # Parse XML and save a private copy, since the parse is shared
+                current_plugin.workflow_config = copy.deepcopy(
+                    _parse_workflow_config(config_xml)
+                )
 
                 # Call decorated function
                 val = func(current_plugin)
@@ -154,9 +158,9 @@ class PluginFactory:
                 return val
             except Exception as e:
                 logger.exception(e)
-                raise e
+                raise
 
-        setattr(self._plugin, "pi_init", wrap_pi_init)
+        self._plugin_ns["pi_init"] = wrap_pi_init
 
     def build_pi_add_incoming_connection(self, func: object):
         """
@@ -174,9 +178,9 @@ class PluginFactory:
         None
         This method produces side-effects by registering the user defined function
         """
+        self._assert_not_generated()
 
         @_monitor("pi_add_incoming_connection")
-        @wraps(func)
         def wrap_pi_add_incoming_connection(
             current_plugin: object, str_type: str, str_name: str
         ):
@@ -192,9 +196,7 @@ class PluginFactory:
             # Return it
             return interface
 
-        setattr(
-            self._plugin, "pi_add_incoming_connection", wrap_pi_add_incoming_connection
-        )
+        self._plugin_ns["pi_add_incoming_connection"] = wrap_pi_add_incoming_connection
 
     def build_pi_push_all_records(self, func: object):
         """
@@ -214,19 +216,15 @@ class PluginFactory:
         None
         This method produces side-effects by registering the user defined function
         """
+        self._assert_not_generated()
 
         @_monitor("push_all_records")
-        @wraps(func)
         def wrap_push_all_records(current_plugin: object, n_record_limit: int):
             try:
-                if len(current_plugin._state_vars.required_input_names) == 0:
+                if not current_plugin._state_vars.required_input_names:
                     if current_plugin.update_only_mode:
                         self._build_metadata(current_plugin)
-                        for (
-                            _,
-                            anchor,
-                        ) in current_plugin._state_vars.output_anchors.items():
-                            anchor.push_metadata(current_plugin)
+                        current_plugin.push_all_metadata()
                     else:
                         # Only call the users defined function when there are no required
                         # inputs, since this is the only scenario where something interesting
@@ -239,9 +237,9 @@ class PluginFactory:
 
             except Exception as e:
                 logger.exception(e)
-                raise e
+                raise
 
-        setattr(self._plugin, "pi_push_all_records", wrap_push_all_records)
+        self._plugin_ns["pi_push_all_records"] = wrap_push_all_records
 
     def build_pi_add_outgoing_connection(self, func: object):
         """
@@ -259,19 +257,17 @@ class PluginFactory:
         None
         This method produces side-effects by registering the user defined function
         """
+        self._assert_not_generated()
 
         @_monitor("pi_add_outgoing_connection")
-        @wraps(func)
         def wrap_pi_add_outgoing_connection(current_plugin: object, str_name: str):
             try:
                 return func(current_plugin, str_name)
             except Exception as e:
                 logger.exception(e)
-                raise e
+                raise
 
-        setattr(
-            self._plugin, "pi_add_outgoing_connection", wrap_pi_add_outgoing_connection
-        )
+        self._plugin_ns["pi_add_outgoing_connection"] = wrap_pi_add_outgoing_connection
 
     def build_pi_close(self, func: object) -> None:
         """
@@ -288,18 +284,21 @@ class PluginFactory:
         None
         This method produces side-effects by registering the user defined function
         """
+        self._assert_not_generated()
+
+        # Skip the completion check entirely when there is nothing to call
+        call_func = func is not _noop
 
         @_monitor("pi_close")
-        @wraps(func)
         def wrap_pi_close(current_plugin: object, b_has_errors: bool) -> None:
             try:
-                if current_plugin.all_inputs_completed:
+                if call_func and current_plugin.all_inputs_completed:
                     func(current_plugin)
             except Exception as e:
                 logger.exception(e)
-                raise e
+                raise
 
-        setattr(self._plugin, "pi_close", wrap_pi_close)
+        self._plugin_ns["pi_close"] = wrap_pi_close
 
     def build_ii_init(self, func: object):
         """
@@ -317,9 +316,11 @@ class PluginFactory:
         None
         This method produces side-effects by registering the user defined function
         """
+        self._assert_not_generated()
+
+        call_func = func is not _always_true
 
         @_monitor("ii_init")
-        @wraps(func)
         def wrap_ii_init(current_interface: object, record_info_in: object):
             try:
                 current_plugin = current_interface.parent
@@ -338,7 +339,9 @@ class PluginFactory:
 
                 current_interface.anchor_metadata = metadata
 
-                init_success = func(current_interface, record_info_in)
+                init_success = (
+                    func(current_interface, record_info_in) if call_func else True
+                )
 
                 if not init_success:
                     current_plugin.initialized = False
@@ -352,18 +355,14 @@ class PluginFactory:
                     ret_val = self._init_func(current_plugin)
                     if ret_val:
                         self._build_metadata(current_plugin)
-                        for (
-                            _,
-                            anchor,
-                        ) in current_plugin._state_vars.output_anchors.items():
-                            anchor.push_metadata(current_plugin)
+                        current_plugin.push_all_metadata()
 
                 return True
             except Exception as e:
                 logger.exception(e)
-                raise e
+                raise
 
-        setattr(self._plugin.plugin_interface, "ii_init", wrap_ii_init)
+        self._interface_ns["ii_init"] = wrap_ii_init
 
     def build_ii_push_record(self, func: object):
         """
@@ -380,9 +379,9 @@ class PluginFactory:
         None
         This method produces side-effects by registering the user defined function
         """
+        self._assert_not_generated()
 
         @_monitor("ii_push_record")
-        @wraps(func)
         def wrap_ii_push_record(current_interface: object, in_record: sdk.RecordRef):
             try:
                 current_plugin = current_interface.parent
@@ -394,9 +393,9 @@ class PluginFactory:
                 return True
             except Exception as e:
                 logger.exception(e)
-                raise e
+                raise
 
-        setattr(self._plugin.plugin_interface, "ii_push_record", wrap_ii_push_record)
+        self._interface_ns["ii_push_record"] = wrap_ii_push_record
 
     def build_ii_update_progress(self, func: object):
         """
@@ -413,9 +412,12 @@ class PluginFactory:
         None
         This method produces side-effects by registering the user defined function
         """
+        self._assert_not_generated()
+
+        # Progress ticks are frequent, so don't call the default no-op on each one
+        call_func = func is not _noop
 
         @_monitor("ii_update_progress")
-        @wraps(func)
         def wrap_ii_update_progress(current_interface: object, d_percentage: float):
             try:
                 current_plugin = current_interface.parent
@@ -424,14 +426,13 @@ class PluginFactory:
 
                 current_plugin.update_progress(d_percentage)
 
-                return func(current_interface, d_percentage)
+                if call_func:
+                    return func(current_interface, d_percentage)
             except Exception as e:
                 logger.exception(e)
-                raise e
+                raise
 
-        setattr(
-            self._plugin.plugin_interface, "ii_update_progress", wrap_ii_update_progress
-        )
+        self._interface_ns["ii_update_progress"] = wrap_ii_update_progress
 
     def build_ii_close(self, func: object):
         """
@@ -449,9 +450,11 @@ class PluginFactory:
         None
         This method produces side-effects by registering the user defined function
         """
+        self._assert_not_generated()
+
+        call_func = func is not _noop
 
         @_monitor("ii_close")
-        @wraps(func)
         def wrap_ii_close(current_interface: object):
             try:
                 current_plugin = current_interface.parent
@@ -463,12 +466,13 @@ class PluginFactory:
 
                 current_interface.completed = True
 
-                return func(current_plugin)
+                if call_func:
+                    return func(current_plugin)
             except Exception as e:
                 logger.exception(e)
-                raise e
+                raise
 
-        setattr(self._plugin.plugin_interface, "ii_close", wrap_ii_close)
+        self._interface_ns["ii_close"] = wrap_ii_close
 
     def initialize_plugin(self, func: object):
         """
@@ -520,21 +524,30 @@ class PluginFactory:
 
                 return init_success
         """
+        self._assert_not_generated()
+
+        func = _apply_parameter_requests(func)
 
         @wraps(func)
         def wrap_init(current_plugin: object):
-            current_plugin.initialized = _apply_parameter_requests(func)(current_plugin)
+            current_plugin.initialized = func(current_plugin)
             return current_plugin.initialized
 
         self._init_func = wrap_init
 
     def build_metadata(self, func: object):
         """Decorate a function to inject user defined build metadata function."""
+        self._assert_not_generated()
+        func = _apply_parameter_requests(func)
 
-        def decorated_build_metadata(plugin: object):
-            return _apply_parameter_requests(func)(plugin)
+        def build_metadata_once(plugin: object):
+            # Metadata is built at most once per run, pi_init resets the flag
+            state_vars = plugin._state_vars
+            if not state_vars.metadata_built:
+                func(plugin)
+                state_vars.metadata_built = True
 
-        self._build_metadata = decorated_build_metadata
+        self._build_metadata = build_metadata_once
         return
 
     def process_data(
@@ -675,11 +688,14 @@ class PluginFactory:
             output_anchor.set_data(output_row)
 
         """
+        self._assert_not_generated()
         # Save the requested data type for later
-        setattr(self._plugin, "process_data_input_type", input_type)
-        setattr(self._plugin, "process_data_mode", mode)
+        self._plugin_ns["process_data_input_type"] = input_type
+        self._plugin_ns["process_data_mode"] = mode.lower()
 
         def decorator_process_data(func: object):
+            self._assert_not_generated()
+
             # Decorate user function to push all records and metadata
             func = _apply_parameter_requests(func)
             func = _push_all_metadata_and_records(func)
@@ -742,20 +758,51 @@ class PluginFactory:
 
                 plugin.clear_accumulated_records()
 
-            @_run_only_if_pi_initialized
+            # The batch and stream ii_push_record methods are installed directly,
+            # rather than through build_ii_push_record, so that each record only
+            # passes through a single frame with the checks its mode needs
+            @_monitor("ii_push_record")
+            def batch_ii_push_record(
+                current_interface: object, in_record: sdk.RecordRef
+            ):
+                try:
+                    plugin = current_interface.parent
+                    state_vars = plugin._state_vars
+
+                    if not state_vars.initialized or plugin.update_only_mode:
+                        return False
+
+                    current_interface.accumulate_record(in_record)
+                    return True
+                except Exception as e:
+                    logger.exception(e)
+                    raise
+
+            @_monitor("ii_push_record")
             def stream_ii_push_record(
-                plugin: object, current_interface: object, in_record: sdk.RecordRef
+                current_interface: object, in_record: sdk.RecordRef
             ):
-                # Since we're streaming, we should clear any accumulated records
-                plugin.clear_accumulated_records()
+                try:
+                    plugin = current_interface.parent
+                    state_vars = plugin._state_vars
 
-                # Then we can accumulate, this guarantees only one interface at a time
-                # ever has a record
-                current_interface.accumulate_record(in_record)
+                    if not state_vars.initialized or plugin.update_only_mode:
+                        return False
 
-                self._build_metadata(plugin)
+                    # Since we're streaming, the record replaces any previously held
+                    # record rather than being accumulated
+                    current_interface.set_current_record(in_record)
 
-                func(plugin)
+                    # Metadata only needs building once per run, so check the flag
+                    # here rather than paying for the call on every record
+                    if not state_vars.metadata_built:
+                        self._build_metadata(plugin)
+
+                    func(plugin)
+                    return True
+                except Exception as e:
+                    logger.exception(e)
+                    raise
 
             @_run_only_if_pi_initialized
             def source_pi_push_all_records(plugin: object, n_record_limit: int):
@@ -766,20 +813,16 @@ class PluginFactory:
                 func(plugin)
 
             if mode.lower() == "batch":
-                self.build_ii_push_record(
-                    lambda plugin, interface, in_record: interface.accumulate_record(
-                        in_record
-                    )
-                )
+                self._interface_ns["ii_push_record"] = batch_ii_push_record
                 self.build_ii_close(batch_ii_close)
             elif mode.lower() == "chunk":
                 self.build_ii_push_record(chunk_ii_push_record)
-                setattr(self._plugin.plugin_interface, "ii_close", chunk_ii_close)
+                self._interface_ns["ii_close"] = chunk_ii_close
             elif mode.lower() == "stream":
                 # Streaming is the unique case for initialization
                 # It should be ran in pi_init.
                 self.build_pi_init(self._init_func)
-                self.build_ii_push_record(stream_ii_push_record)
+                self._interface_ns["ii_push_record"] = stream_ii_push_record
             elif mode.lower() == "source":
                 self.build_pi_push_all_records(source_pi_push_all_records)
             else:
@@ -805,14 +848,55 @@ class PluginFactory:
         object: AyxPlugin class definition
         The returned object is a modified AyxPlugin class definition, updated with
         the user definied functions injected by use of the various decorators the user
-        has called.
+        has called. The class is built once, so all methods must be registered
+        before the first call.
 
         Example
         -------
             AyxPlugin = factory.generate_plugin()
 
         """
-        return self._plugin
+        if self._generated_plugin is not None:
+            return self._generated_plugin
+
+        tool_name = self._plugin_ns["tool_name"]
+
+        interface = type(
+            f"{tool_name}Interface", (AyxPluginInterface,), dict(self._interface_ns)
+        )
+
+        self._generated_plugin = type(
+            f"{tool_name}Plugin",
+            (AyxPlugin,),
+            dict(self._plugin_ns, plugin_interface=interface),
+        )
+        return self._generated_plugin
+
+    def _assert_not_generated(self) -> None:
+        """Raise an error if the plugin classes have already been generated."""
+        if self._generated_plugin is not None:
+            err_str = """Methods must be registered on the PluginFactory before
+                generate_plugin is called."""
+            raise RuntimeError(err_str)
+
+
+# Shared defaults for callbacks the user doesn't register. The engine never passes
+# keyword arguments, so there is no **kwargs dict to build per call
+def _noop(*args) -> None:
+    pass
+
+
+def _always_true(*args) -> bool:
+    return True
+
+
+@lru_cache(maxsize=32)
+def _parse_workflow_config(config_xml: str) -> dict:
+    # Designer re-initializes tools with the same configuration often, so repeated
+    # XML is only run through the parser once. Plain dicts are used over the
+    # default OrderedDicts, they are cheaper to look up and to copy per plugin
+    parsed = xmltodict.parse(config_xml, strip_whitespace=False, dict_constructor=dict)
+    return parsed["Configuration"]
 
 
 def _run_only_if_pi_initialized(func):
@@ -842,68 +926,60 @@ def _push_all_metadata_and_records(func):
 
 
 def _apply_parameter_requests(func):
+    # Resolve the requested parameters once, instead of inspecting the signature
+    # every time the engine calls back into the user function
+    param_names = list(inspect.signature(func).parameters)
+    if not all(name in _PARAMETER_GETTERS for name in param_names):
+        # Failed to build the requested params, using defaults
+        param_names = None
+
     @wraps(func)
     def wrapped(plugin):
-        import inspect
-
-        sig = inspect.signature(func)
-
-        func_params = {
-            "input_mgr": plugin.input_manager,
-            "output_mgr": plugin.output_manager,
-            "workflow_config": plugin.input_manager.workflow_config,
-            "user_data": plugin.user_data,
-            "logger": plugin.logging,
-        }
-
-        try:
-            # Get the expected parameter names
-            param_names = [name for name, param in sig.parameters.items()]
-            passed_params = {name: func_params[name] for name in param_names}
-        except KeyError:
-            # Failed to build the requested params, using defaults
+        if param_names is None:
             return func(
                 plugin.input_manager,
                 plugin.output_manager,
                 plugin.user_data,
                 plugin.logging,
             )
-        else:
-            return func(**passed_params)
+
+        return func(**{name: _PARAMETER_GETTERS[name](plugin) for name in param_names})
 
     return wrapped
 
 
 def _monitor(name):
     def _monitor_decorator(func):
+        if not DEBUG:
+            # Timing is off, so hand back the function itself rather than adding
+            # another frame to every engine callback
+            return func
+
         @wraps(func)
         def wrapped(*args, **kwargs):
-            if DEBUG:
-                import time
-                from pathlib import Path
-                import pandas as pd
-
-                start_time = time.time()
-                val = func(*args, **kwargs)
-                end_time = time.time()
-                time_diff_ms = (end_time - start_time) * 1000
-
-                # Write to a file
-                file_name = Path("C:/debug.csv")
-
-                if not file_name.is_file():
-                    data = {"Func": [name], "Time": [time_diff_ms]}
-                    df = pd.DataFrame(data)
-                else:
-                    data = {"Func": [name], "Time": [time_diff_ms]}
-                    df_new = pd.DataFrame(data)
-                    df_old = pd.read_csv(file_name)
-                    df = pd.concat([df_old, df_new])
+            import time
+            from pathlib import Path
+            import pandas as pd
 
-                df.to_csv(file_name, index=False)
-                return val
+            start_time = time.time()
+            val = func(*args, **kwargs)
+            end_time = time.time()
+            time_diff_ms = (end_time - start_time) * 1000
+
+            # Write to a file
+            file_name = Path("C:/debug.csv")
+
+            if not file_name.is_file():
+                data = {"Func": [name], "Time": [time_diff_ms]}
+                df = pd.DataFrame(data)
             else:
-                return func(*args, **kwargs)
+                data = {"Func": [name], "Time": [time_diff_ms]}
+                df_new = pd.DataFrame(data)
+                df_old = pd.read_csv(file_name)
+                df = pd.concat([df_old, df_new])
+
+            df.to_csv(file_name, index=False)
+            return val
 
         return wrapped
 